@@ -8,7 +8,7 @@ bl_info = {
 import bpy
 
 from .anim_import import ImportRKAnimData
-from .rk_import import ImportRKData, RK_FH_script_import
+from .rk_import import ImportRKData, ReloadRKTextures, RK_FH_script_import
 
 
 # Only needed if you want to add into a dynamic menu.
@@ -17,19 +17,30 @@ def menu_func_import(self, context):
     self.layout.operator(ImportRKAnimData.bl_idname, text="Import RK .anim File")
 
 
+def menu_func_reload_textures(self, context):
+    self.layout.separator()
+    self.layout.operator(ReloadRKTextures.bl_idname)
+
+
 # Register and add to the "file selector" menu (required to use F3 search "Text Import Operator" for quick access).
 def register():
     bpy.utils.register_class(ImportRKData)
     bpy.utils.register_class(RK_FH_script_import)
     bpy.utils.register_class(ImportRKAnimData)
+    bpy.utils.register_class(ReloadRKTextures)
     bpy.types.TOPBAR_MT_file_import.append(menu_func_import)
+    bpy.types.VIEW3D_MT_object_context_menu.append(menu_func_reload_textures)
+    bpy.types.IMAGE_MT_image.append(menu_func_reload_textures)
 
 
 def unregister():
     bpy.utils.unregister_class(ImportRKData)
     bpy.utils.unregister_class(RK_FH_script_import)
     bpy.utils.unregister_class(ImportRKAnimData)
+    bpy.utils.unregister_class(ReloadRKTextures)
     bpy.types.TOPBAR_MT_file_import.remove(menu_func_import)
+    bpy.types.VIEW3D_MT_object_context_menu.remove(menu_func_reload_textures)
+    bpy.types.IMAGE_MT_image.remove(menu_func_reload_textures)
 
 
 if __name__ == "__main__":
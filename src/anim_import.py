@@ -1,6 +1,10 @@
 """
 Currently it expects you to load `pony_type01.anim`, because I currently
 have it hardcoded to load a specific animation from that file.
+
+Every frame of the file is loaded into memory by `Anim`, even though only
+one clip gets imported. Streaming the frames in chunks needs luna_kit to be
+able to read just a range of frames from the file, so it has to be done there first.
 """
 
 import math
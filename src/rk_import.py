@@ -12,7 +12,8 @@ from luna_kit.model import rk
 from luna_kit.model.rk import RKModel
 from mathutils import Color, Matrix, Vector
 
-from .utils import add_to_vertex_group, pil_to_image
+from .utils import (add_to_vertex_group, mip_level_for_size, mip_size,
+                    pil_to_image, replace_image_pixels, rk_material_flag)
 
 
 class ImportRKData(Operator, ImportHelper):
@@ -39,6 +40,32 @@ class ImportRKData(Operator, ImportHelper):
         default = 'unlit',
     ) # type: ignore
 
+    texture_budget_mode: bpy.props.EnumProperty(
+        items = [
+            ('none', 'Full resolution', 'Load every texture at full resolution.'),
+            ('texture', 'Per texture', 'Downscale each texture until its largest side fits within the budget.'),
+            ('scene', 'Per scene', 'Downscale all imported textures by the same amount until their total size fits within the budget.'),
+        ],
+        name = 'Texture budget',
+        description = 'Downscale textures while importing (textures marked NeverDownscale are always loaded at full resolution).',
+        default = 'none',
+    ) # type: ignore
+
+    texture_max_size: bpy.props.IntProperty(
+        name = 'Max texture size',
+        description = 'Largest side (in pixels) of a texture with the per texture budget.',
+        default = 1024,
+        min = 1,
+        subtype = 'PIXEL',
+    ) # type: ignore
+
+    texture_scene_megapixels: bpy.props.FloatProperty(
+        name = 'Scene texture megapixels',
+        description = 'Total size (in megapixels) of all imported textures with the per scene budget. Each file is read twice, once for the texture sizes and once to import it.',
+        default = 16.0,
+        min = 0.01,
+    ) # type: ignore
+
     filter_glob: bpy.props.StringProperty(
         default="*.rk",
         options={'HIDDEN'},
@@ -58,10 +85,15 @@ class ImportRKData(Operator, ImportHelper):
         if not self.directory:
             return {'CANCELLED'}
         
-        for file in self.files:
-            file: bpy.types.OperatorFileListElement
-            
-            self.import_rk_file(os.path.join(self.directory, file.name), context)
+        filenames = [os.path.join(self.directory, file.name) for file in self.files]
+        
+        scene_mip_levels = None
+        if self.texture_budget_mode == 'scene':
+            # the budget is shared by every file, so all the texture sizes are needed up front
+            scene_mip_levels = self.get_scene_mip_levels(self.get_texture_sizes(filenames))
+        
+        for filename in filenames:
+            self.import_rk_file(filename, context, scene_mip_levels)
             
         # self.import_rk_file(self.filepath, context)
         return {'FINISHED'}
@@ -73,7 +105,12 @@ class ImportRKData(Operator, ImportHelper):
         # context.window_manager.fileselect_add(self)
         # return {'RUNNING_MODAL'}
 
-    def import_rk_file(self, filename: str, context: bpy.types.Context):
+    def import_rk_file(
+        self,
+        filename: str,
+        context: bpy.types.Context,
+        scene_mip_levels: dict[str, int] | None = None,
+    ):
         collection = context.collection
 
         rk_model = RKModel(filename)
@@ -107,6 +144,8 @@ class ImportRKData(Operator, ImportHelper):
                 material = self.create_material(
                     rk_model.materials[rk_mesh.material_index],
                     self.shader_method,
+                    filename,
+                    scene_mip_levels,
                 )
                 
                 materials[rk_mesh.material] = material
@@ -207,6 +246,8 @@ class ImportRKData(Operator, ImportHelper):
         self,
         rk_material: rk.Material,
         method: Literal['bsdf', 'unlit'],
+        filename: str | None = None,
+        scene_mip_levels: dict[str, int] | None = None,
     ):
         material = bpy.data.materials.get(rk_material.name)
         if material is None:
@@ -226,12 +267,18 @@ class ImportRKData(Operator, ImportHelper):
             texture_node: bpy.types.ShaderNodeTexImage = nodes.new(type = 'ShaderNodeTexImage')
             image = rk_material.properties.image
             if image is not None:
+                mip_level = self.get_mip_level(rk_material, scene_mip_levels)
                 texture_node.image = pil_to_image(
                     image,
                     rk_material.name,
                     # flip_vertical = True,
                     alpha = True,
+                    mip_level = mip_level,
                 )
+                texture_node.image['rk_mip_level'] = mip_level
+                texture_node.image['rk_material'] = rk_material.name
+                if filename is not None:
+                    texture_node.image['rk_filepath'] = filename
             
             match method:
                 case 'unlit':
@@ -283,6 +330,106 @@ class ImportRKData(Operator, ImportHelper):
 
         return material
 
+    def get_mip_level(
+        self,
+        rk_material: rk.Material,
+        scene_mip_levels: dict[str, int] | None = None,
+    ) -> int:
+        image = rk_material.properties.image
+        if image is None or self.texture_budget_mode == 'none':
+            return 0
+        if rk_material_flag(rk_material, 'NeverDownscale'):
+            return 0
+
+        match self.texture_budget_mode:
+            case 'texture':
+                level = mip_level_for_size(image.width, image.height, self.texture_max_size)
+                # same as the per scene budget, these drop one more level once they need downscaling
+                if level > 0 and rk_material_flag(rk_material, 'NormalQualityForceDownscale'):
+                    level += 1
+                return level
+            case 'scene':
+                return (scene_mip_levels or {}).get(rk_material.name, 0)
+            case _:
+                raise ValueError(f'Unknown texture budget mode: {self.texture_budget_mode}')
+
+    def get_texture_sizes(self, filenames: list[str]):
+        """Collect the texture sizes of every file, one file in memory at a time"""
+        # the same material can be shared between files, but only gets loaded once
+        sizes: dict[str, tuple[int, int, bool, bool]] = {}
+
+        for filename in filenames:
+            rk_model = RKModel(filename)
+            for rk_material in rk_model.materials:
+                image = rk_material.properties.image
+                if image is None:
+                    continue
+                sizes[rk_material.name] = (
+                    image.width,
+                    image.height,
+                    rk_material_flag(rk_material, 'NeverDownscale'),
+                    rk_material_flag(rk_material, 'NormalQualityForceDownscale'),
+                )
+            del rk_model
+
+        return sizes
+
+    def get_scene_mip_levels(
+        self,
+        sizes: dict[str, tuple[int, int, bool, bool]],
+    ) -> dict[str, int]:
+        budget = self.texture_scene_megapixels * 1_000_000
+
+        fixed_pixels = sum(
+            width * height
+            for width, height, fixed, force in sizes.values()
+            if fixed
+        )
+        scalable = {
+            name: (width, height, force)
+            for name, (width, height, fixed, force) in sizes.items()
+            if not fixed
+        }
+
+        if not scalable:
+            if fixed_pixels > budget:
+                self.report({'WARNING'}, 'Textures marked NeverDownscale are larger than the texture budget')
+            return {}
+
+        remaining = budget - fixed_pixels
+        if remaining <= 0:
+            # the budget can't be met, so just make the rest fit the budget on their own
+            self.report({'WARNING'}, 'Textures marked NeverDownscale are larger than the texture budget')
+            remaining = budget
+
+        # the game drops a mip level for NormalQualityForceDownscale textures on normal quality,
+        # so they always stay one level below everything else once downscaling starts
+        def get_levels(step: int):
+            return {
+                name: step if force else max(step - 1, 0)
+                for name, (width, height, force) in scalable.items()
+            }
+
+        def total_pixels(levels: dict[str, int]):
+            return sum(
+                mip_size(width, levels[name]) * mip_size(height, levels[name])
+                for name, (width, height, force) in scalable.items()
+            )
+
+        def all_smallest(levels: dict[str, int]):
+            return all(
+                mip_size(width, levels[name]) == 1 and mip_size(height, levels[name]) == 1
+                for name, (width, height, force) in scalable.items()
+            )
+
+        step = 0
+        levels = get_levels(step)
+        while total_pixels(levels) > remaining and not all_smallest(levels):
+            step += 1
+            levels = get_levels(step)
+
+        return levels
+
     def mesh_add_faces(
         self,
         obj: bpy.types.Object,
@@ -353,6 +500,88 @@ class ImportRKData(Operator, ImportHelper):
 
             face.material_index = material_id
 
+class ReloadRKTextures(Operator):
+    """Reload downscaled RK textures at full resolution"""
+    bl_idname = "image.rk_reload_full_resolution"
+    bl_label = "Reload RK Textures at Full Resolution"
+    # no 'UNDO', image pixels replaced from python aren't restored by the undo system
+    bl_options = {'REGISTER'}
+
+    image_name: bpy.props.StringProperty(
+        name = 'Image',
+        description = 'Image to reload. When empty, the image in the image editor or the textures of the selected objects are reloaded.',
+        options = {'SKIP_SAVE'},
+    ) # type: ignore
+
+    @classmethod
+    def poll(cls, context):
+        return bool(cls.get_editor_image(context) or context.selected_objects)
+
+    @staticmethod
+    def get_editor_image(context: bpy.types.Context) -> bpy.types.Image | None:
+        space = context.space_data
+        if space is not None and space.type == 'IMAGE_EDITOR':
+            return space.image
+        return None
+
+    def execute(self, context: bpy.types.Context):
+        if self.image_name:
+            images = [bpy.data.images[self.image_name]] if self.image_name in bpy.data.images else []
+        elif self.get_editor_image(context):
+            images = [self.get_editor_image(context)]
+        else:
+            images = self.get_selected_images(context)
+
+        images = [
+            image for image in images
+            if image.get('rk_mip_level', 0) > 0 and image.get('rk_filepath')
+        ]
+
+        if not images:
+            self.report({'INFO'}, 'No downscaled RK textures to reload')
+            return {'CANCELLED'}
+
+        by_file: dict[str, list[bpy.types.Image]] = {}
+        for image in images:
+            by_file.setdefault(image['rk_filepath'], []).append(image)
+
+        for filename, file_images in by_file.items():
+            if not os.path.exists(filename):
+                self.report({'WARNING'}, f'Cannot find {filename}')
+                continue
+
+            rk_model = RKModel(filename)
+            rk_materials = {rk_material.name: rk_material for rk_material in rk_model.materials}
+
+            for image in file_images:
+                rk_material = rk_materials.get(image.get('rk_material', image.name))
+                if rk_material is None or rk_material.properties.image is None:
+                    self.report({'WARNING'}, f'Cannot find texture {image.name} in {filename}')
+                    continue
+
+                self.report({'INFO'}, f'reloading texture: {image.name}')
+                replace_image_pixels(image, rk_material.properties.image)
+                image['rk_mip_level'] = 0
+
+        return {'FINISHED'}
+
+    def get_selected_images(self, context: bpy.types.Context):
+        images: list[bpy.types.Image] = []
+
+        for obj in context.selected_objects:
+            for child in [obj, *obj.children_recursive]:
+                if child.type != 'MESH':
+                    continue
+                for material in child.data.materials:
+                    if material is None or not material.node_tree:
+                        continue
+                    for node in material.node_tree.nodes:
+                        if node.type == 'TEX_IMAGE' and node.image and node.image not in images:
+                            images.append(node.image)
+
+        return images
+
+
 class RK_FH_script_import(bpy.types.FileHandler):
     bl_idname = "RK_FH_script_import"
     bl_label = "File handler for rk import"
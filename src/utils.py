@@ -8,16 +8,69 @@ from mathutils import Matrix, Vector
 from PIL import Image
 
 
-def pil_to_image(
+def rk_material_flag(rk_material: rk.Material, name: str) -> bool:
+    '''
+    RK material flags (`NeverDownscale`, `NormalQualityForceDownscale`, ...) are stored as `'1'`/`'0'`
+    strings in the .rkm, so a plain truth test isn't enough
+    '''
+    value = getattr(rk_material.properties, name, None)
+    if isinstance(value, str):
+        return value.strip() not in ('', '0')
+    return bool(value)
+
+def mip_size(size: int, level: int) -> int:
+    '''
+    size of one side after `level` mip levels. `downscale_pixels` pads instead of cropping,
+    so this rounds up, and never goes below 1
+    '''
+    return max((size + (1 << level) - 1) >> level, 1)
+
+def mip_level_for_size(width: int, height: int, max_size: int) -> int:
+    '''
+    smallest mip level (power of two downscale) that fits the largest side within `max_size`
+    '''
+    level = 0
+    if max_size <= 0:
+        return level
+    while max(mip_size(width, level), mip_size(height, level)) > max_size:
+        level += 1
+    return level
+
+def downscale_pixels(pixels: numpy.ndarray, level: int) -> numpy.ndarray:
+    '''
+    box filter a (height, width, channels) array down `level` mip levels in one pass.
+    edges are padded so sizes that aren't a multiple of the factor keep their border pixels,
+    and the result is always `mip_size` on each side
+    '''
+    if level <= 0:
+        return pixels
+    
+    height, width, channels = pixels.shape
+    
+    # an axis shorter than the factor only needs padding up to its own power of two to end up as 1 pixel
+    factor_height = min(1 << level, 1 << (height - 1).bit_length())
+    factor_width = min(1 << level, 1 << (width - 1).bit_length())
+    
+    pad_height = -height % factor_height
+    pad_width = -width % factor_width
+    if pad_height or pad_width:
+        pixels = numpy.pad(pixels, ((0, pad_height), (0, pad_width), (0, 0)), mode = 'edge')
+    
+    return pixels.reshape(
+        pixels.shape[0] // factor_height, factor_height,
+        pixels.shape[1] // factor_width, factor_width,
+        channels,
+    ).mean(axis = (1, 3), dtype = numpy.float32)
+
+def pil_to_pixels(
     pil_image: Image.Image,
-    name: str = 'NewImage',
-    alpha: bool = False,
+    mip_level: int = 0,
     flip_vertical: bool = False,
     flip_horizontal: bool = False,
-):
+) -> numpy.ndarray:
     '''
-    PIL image pixels is 2D array of byte tuple (when mode is 'RGB', 'RGBA') or byte (when mode is 'L')
-    bpy image pixels is flat array of normalized values in RGBA order
+    convert a PIL image to a (height, width, 4) array of normalized RGBA floats,
+    downscaled by `mip_level`
     '''
     # setup PIL image conversion
     if flip_vertical:
@@ -25,19 +78,44 @@ def pil_to_image(
     if flip_horizontal:
         pil_image = pil_image.transpose(Image.Transpose.FLIP_LEFT_RIGHT)
     
-    width = pil_image.width
-    height = pil_image.height
     byte_to_normalized = 1.0 / 255.0
+    
+    # downscale while still bytes, so the full resolution float copy never exists
+    pixels = numpy.asarray(pil_image.convert('RGBA'))
+    if mip_level > 0:
+        pixels = downscale_pixels(pixels, mip_level)
+    
+    pixels = pixels.astype(numpy.float32, copy = False)
+    pixels *= byte_to_normalized
+    return pixels
+
+def pil_to_image(
+    pil_image: Image.Image,
+    name: str = 'NewImage',
+    alpha: bool = False,
+    flip_vertical: bool = False,
+    flip_horizontal: bool = False,
+    mip_level: int = 0,
+):
+    '''
+    PIL image pixels is 2D array of byte tuple (when mode is 'RGB', 'RGBA') or byte (when mode is 'L')
+    bpy image pixels is flat array of normalized values in RGBA order
+    
+    `mip_level` downscales the image by `2 ** mip_level` before it gets uploaded.
+    '''
+    pixels = pil_to_pixels(
+        pil_image,
+        mip_level = mip_level,
+        flip_vertical = flip_vertical,
+        flip_horizontal = flip_horizontal,
+    )
+    
+    height, width = pixels.shape[:2]
     # create new image
     bpy_image = bpy.data.images.new(name, width=width, height=height, alpha=alpha)
 
-    # convert Image 'L' to 'RGBA', normalize then flatten 
-    bpy_image.pixels.foreach_set(
-        (numpy.asarray(
-            pil_image.convert('RGBA'),
-            dtype=numpy.float32,
-        ) * byte_to_normalized).ravel(),
-    )
+    # 'L' images are already converted to 'RGBA', so just flatten
+    bpy_image.pixels.foreach_set(pixels.ravel())
     bpy_image.pack()
     
     texture: bpy.types.ImageTexture = bpy.data.textures.new(name = name, type = "IMAGE")
@@ -45,6 +123,30 @@ def pil_to_image(
     
     return bpy_image
 
+def replace_image_pixels(
+    bpy_image: bpy.types.Image,
+    pil_image: Image.Image,
+    flip_vertical: bool = False,
+    flip_horizontal: bool = False,
+):
+    '''
+    replace the pixels of an existing image with `pil_image` at full resolution
+    '''
+    pixels = pil_to_pixels(
+        pil_image,
+        flip_vertical = flip_vertical,
+        flip_horizontal = flip_horizontal,
+    )
+    
+    height, width = pixels.shape[:2]
+    if tuple(bpy_image.size) != (width, height):
+        bpy_image.scale(width, height)
+    
+    bpy_image.pixels.foreach_set(pixels.ravel())
+    bpy_image.pack()
+    
+    return bpy_image
+
 # Code from https://blender.stackexchange.com/a/90240/151009
 def vec_roll_to_mat3(vec: Vector, roll: float):
     #port of the updated C function from armature.c